@@ -4,99 +4,129 @@ Detailed Test Method Mapping Analysis
 Maps every Swift test method to its C# counterpart (if exists)
 """
 
+import bisect
+import io
 import os
 import re
 from pathlib import Path
 from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Test method signatures, compiled once and reused for every file scanned
+_SWIFT_TEST_RE = re.compile(r'(?:public\s+)?func\s+(test\w+)\s*\([^)]*\)(?:\s+async)?(?:\s+throws)?\s*\{', re.MULTILINE)
+_CSHARP_TEST_RE = re.compile(r'\[(?:Test|UnityTest)[^\]]*\]\s*(?:public\s+)?(?:async\s+)?(Task|void|IEnumerator)\s+(\w*Test\w*)\s*\([^)]*\)', re.MULTILINE | re.DOTALL)
+_BRACE_RE = re.compile(r'[{}]')
+_NEWLINE_RE = re.compile(r'\n')
+# Body markers, collected in a single pass per method (no marker overlaps another, so none is hidden).
+# Bodies are scanned in place via pos/endpos, which stdlib re does without copying the file; engines
+# that re-encode the whole text per call (e.g. RE2 on str) would make this quadratic again.
+_SWIFT_MARKERS_RE = re.compile(r'XCTAssert(?:ThrowsError)?|mockUrlSession|Mock|async|await')
+_CSHARP_MARKERS_RE = re.compile(r'\[UnityTest\]|\[Performance\]|Assert\.|Mock|Throws|Exception|async')
+
+@dataclass(slots=True, frozen=True)
+class SwiftTestMethod:
+    """Test method found in a Swift test file"""
+    name: str
+    line: int
+    body_length: int
+    tests_async: bool
+    has_assertions: bool
+    mock_usage: bool
+    error_testing: bool
+
+@dataclass(slots=True, frozen=True)
+class CSharpTestMethod:
+    """Test method found in a C# test file"""
+    name: str
+    line: int
+    return_type: str
+    body_length: int
+    is_async: bool
+    is_unity_test: bool
+    has_assertions: bool
+    mock_usage: bool
+    performance_test: bool
+    error_testing: bool
+
+def match_braces(content: str) -> dict:
+    """Map each opening brace offset to the offset of its closing brace"""
+    close_of = {}
+    stack = []
+    for match in _BRACE_RE.finditer(content):
+        if match.group() == '{':
+            stack.append(match.start())
+        elif stack:
+            close_of[stack.pop()] = match.start()
+    return close_of
 
 def extract_detailed_test_methods(file_path: str, is_swift: bool):
     """Extract detailed test method information"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = Path(file_path).read_bytes().decode('utf-8', errors='replace')
         
         methods = []
+        close_of = match_braces(content)
+        newline_offsets = [m.start() for m in _NEWLINE_RE.finditer(content)]
         
         if is_swift:
             # Extract Swift test methods with more context
-            pattern = r'(?:public\s+)?func\s+(test\w+)\s*\([^)]*\)(?:\s+async)?(?:\s+throws)?\s*\{'
-            matches = re.finditer(pattern, content, re.MULTILINE)
+            matches = _SWIFT_TEST_RE.finditer(content)
             
             for match in matches:
                 method_name = match.group(1)
                 # Get the line number
-                line_start = content[:match.start()].count('\n') + 1
+                line_start = bisect.bisect_left(newline_offsets, match.start()) + 1
                 
                 # Extract method body to understand what it tests
-                brace_count = 0
                 pos = match.end() - 1  # Start at the opening brace
-                method_end = pos
+                method_end = close_of[pos] + 1 if pos in close_of else pos
                 
-                for i, char in enumerate(content[pos:], pos):
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            method_end = i + 1
-                            break
-                
-                method_body = content[match.start():method_end]
-                
-                # Analyze what the method tests
-                test_info = {
-                    'name': method_name,
-                    'line': line_start,
-                    'body_length': len(method_body.split('\n')),
-                    'tests_async': 'async' in method_body or 'await' in method_body,
-                    'has_assertions': 'XCTAssert' in method_body or 'XCTAssertEqual' in method_body,
-                    'mock_usage': 'mockUrlSession' in method_body or 'Mock' in method_body,
-                    'error_testing': 'XCTAssertThrowsError' in method_body or 'throws' in method_name.lower(),
-                }
+                # Analyze what the method tests, scanning the body in place rather than slicing it out
+                markers = set(_SWIFT_MARKERS_RE.findall(content, match.start(), method_end))
+                test_info = SwiftTestMethod(
+                    name=method_name,
+                    line=line_start,
+                    body_length=content.count('\n', match.start(), method_end) + 1,
+                    tests_async='async' in markers or 'await' in markers,
+                    has_assertions='XCTAssert' in markers or 'XCTAssertThrowsError' in markers,
+                    mock_usage='mockUrlSession' in markers or 'Mock' in markers,
+                    error_testing='XCTAssertThrowsError' in markers or 'throws' in method_name.lower(),
+                )
                 
                 methods.append(test_info)
         
         else:  # C# 
             # Extract C# test methods with attributes
-            pattern = r'\[(?:Test|UnityTest)[^\]]*\]\s*(?:public\s+)?(?:async\s+)?(Task|void|IEnumerator)\s+(\w*Test\w*)\s*\([^)]*\)'
-            matches = re.finditer(pattern, content, re.MULTILINE | re.DOTALL)
+            matches = _CSHARP_TEST_RE.finditer(content)
             
             for match in matches:
                 return_type = match.group(1)
                 method_name = match.group(2)
-                line_start = content[:match.start()].count('\n') + 1
+                line_start = bisect.bisect_left(newline_offsets, match.start()) + 1
                 
                 # Get method body
-                brace_count = 0
-                pos = match.end()
-                # Find opening brace
-                while pos < len(content) and content[pos] != '{':
-                    pos += 1
-                
-                method_end = pos
-                for i, char in enumerate(content[pos:], pos):
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            method_end = i + 1
-                            break
+                pos = content.find('{', match.end())
+                if pos == -1:
+                    pos = len(content)
+                method_end = close_of[pos] + 1 if pos in close_of else pos
                 
-                method_body = content[match.start():method_end] if method_end > pos else content[match.start():match.end() + 100]
+                # Fall back to the signature plus a little context when the body cannot be delimited
+                body_end = method_end if method_end > pos else min(match.end() + 100, len(content))
                 
-                test_info = {
-                    'name': method_name,
-                    'line': line_start,
-                    'return_type': return_type,
-                    'body_length': len(method_body.split('\n')),
-                    'is_async': return_type == 'Task' or 'async' in method_body,
-                    'is_unity_test': '[UnityTest]' in method_body,
-                    'has_assertions': 'Assert.' in method_body,
-                    'mock_usage': 'Mock' in method_body,
-                    'performance_test': '[Performance]' in method_body,
-                    'error_testing': 'Throws' in method_body or 'Exception' in method_body,
-                }
+                markers = set(_CSHARP_MARKERS_RE.findall(content, match.start(), body_end))
+                test_info = CSharpTestMethod(
+                    name=method_name,
+                    line=line_start,
+                    return_type=return_type,
+                    body_length=content.count('\n', match.start(), body_end) + 1,
+                    is_async=return_type == 'Task' or 'async' in markers,
+                    is_unity_test='[UnityTest]' in markers,
+                    has_assertions='Assert.' in markers,
+                    mock_usage='Mock' in markers,
+                    performance_test='[Performance]' in markers,
+                    error_testing='Throws' in markers or 'Exception' in markers,
+                )
                 
                 methods.append(test_info)
                 
@@ -106,6 +136,7 @@ def extract_detailed_test_methods(file_path: str, is_swift: bool):
         print(f"Error processing {file_path}: {e}")
         return []
 
+@lru_cache(maxsize=4096)
 def normalize_test_name(name: str) -> str:
     """Normalize test names for comparison"""
     # Remove common prefixes and make lowercase
@@ -121,19 +152,16 @@ def normalize_test_name(name: str) -> str:
     # Remove underscores and normalize
     return ''.join(name.split('_'))
 
-def find_matching_c_sharp_method(swift_method: dict, csharp_methods: list) -> dict:
+def find_matching_c_sharp_method(swift_method: SwiftTestMethod, cs_index: dict, cs_norm_list: list) -> dict:
     """Find the best matching C# method for a Swift method"""
-    swift_normalized = normalize_test_name(swift_method['name'])
+    swift_normalized = normalize_test_name(swift_method.name)
     
     # Direct name matching
-    for cs_method in csharp_methods:
-        cs_normalized = normalize_test_name(cs_method['name'])
-        if swift_normalized == cs_normalized:
-            return {'match_type': 'exact', 'method': cs_method}
+    if swift_normalized in cs_index:
+        return {'match_type': 'exact', 'method': cs_index[swift_normalized]}
     
     # Partial matching
-    for cs_method in csharp_methods:
-        cs_normalized = normalize_test_name(cs_method['name'])
+    for cs_normalized, cs_method in cs_norm_list:
         if swift_normalized in cs_normalized or cs_normalized in swift_normalized:
             return {'match_type': 'partial', 'method': cs_method}
     
@@ -153,31 +181,44 @@ def analyze_file_pair(swift_file: str, csharp_file: str, swift_methods: list, cs
     }
     
     matched_cs_methods = set()
+    exact_ct = partial_ct = 0
+    
+    # Normalize C# names once: first method per name for exact lookups, all for partial matching
+    cs_index = {}
+    cs_norm_list = []
+    for cs_method in csharp_methods:
+        cs_normalized = normalize_test_name(cs_method.name)
+        cs_index.setdefault(cs_normalized, cs_method)
+        cs_norm_list.append((cs_normalized, cs_method))
     
     # Match Swift methods to C# methods
     for swift_method in swift_methods:
-        match = find_matching_c_sharp_method(swift_method, csharp_methods)
+        match = find_matching_c_sharp_method(swift_method, cs_index, cs_norm_list)
         if match:
             analysis['matched_methods'].append({
                 'swift': swift_method,
                 'csharp': match['method'], 
                 'match_type': match['match_type']
             })
-            matched_cs_methods.add(match['method']['name'])
+            matched_cs_methods.add(match['method'].name)
+            if match['match_type'] == 'exact':
+                exact_ct += 1
+            else:
+                partial_ct += 1
         else:
             analysis['unmatched_swift'].append(swift_method)
     
     # Find extra C# methods not in Swift
     for cs_method in csharp_methods:
-        if cs_method['name'] not in matched_cs_methods:
+        if cs_method.name not in matched_cs_methods:
             analysis['extra_csharp'].append(cs_method)
     
     # Calculate coverage statistics
     analysis['coverage_stats'] = {
         'coverage_percentage': round((len(analysis['matched_methods']) / len(swift_methods)) * 100 if swift_methods else 0, 1),
         'enhancement_factor': round(len(csharp_methods) / len(swift_methods) if swift_methods else 0, 2),
-        'exact_matches': len([m for m in analysis['matched_methods'] if m['match_type'] == 'exact']),
-        'partial_matches': len([m for m in analysis['matched_methods'] if m['match_type'] == 'partial']),
+        'exact_matches': exact_ct,
+        'partial_matches': partial_ct,
         'missing_methods': len(analysis['unmatched_swift']),
         'enhancement_methods': len(analysis['extra_csharp'])
     }
@@ -203,10 +244,11 @@ def generate_detailed_mapping_report():
     swift_base = "/home/neo/git/NeoUnity/NeoSwift/Tests/NeoSwiftTests/unit"
     csharp_base = "/home/neo/git/NeoUnity/Tests/Runtime"
     
-    report = []
-    report.append("# 🔍 DETAILED TEST METHOD MAPPING ANALYSIS")
-    report.append("## Method-by-Method Swift → C# Test Comparison")
-    report.append("")
+    report = io.StringIO()
+    write = report.write
+    write("# 🔍 DETAILED TEST METHOD MAPPING ANALYSIS\n")
+    write("## Method-by-Method Swift → C# Test Comparison\n")
+    write("\n")
     
     total_coverage_stats = {
         'total_swift_methods': 0,
@@ -214,6 +256,7 @@ def generate_detailed_mapping_report():
         'total_enhancement_methods': 0
     }
     
+    available_pairs = []
     for swift_rel, csharp_rel in key_pairs:
         swift_path = os.path.join(swift_base, swift_rel)
         csharp_path = os.path.join(csharp_base, csharp_rel)
@@ -226,9 +269,16 @@ def generate_detailed_mapping_report():
             print(f"Warning: C# file not found: {csharp_path}")
             continue
         
-        swift_methods = extract_detailed_test_methods(swift_path, is_swift=True)
-        csharp_methods = extract_detailed_test_methods(csharp_path, is_swift=False)
-        
+        available_pairs.append((swift_rel, csharp_rel, swift_path, csharp_path))
+    
+    # Extract serially: with at most 18 files a process pool costs more than it saves
+    file_paths = [p[2] for p in available_pairs] + [p[3] for p in available_pairs]
+    is_swift_flags = [True] * len(available_pairs) + [False] * len(available_pairs)
+    all_methods = list(map(extract_detailed_test_methods, file_paths, is_swift_flags))
+    all_swift_methods = all_methods[:len(available_pairs)]
+    all_csharp_methods = all_methods[len(available_pairs):]
+    
+    for (swift_rel, csharp_rel, _, _), swift_methods, csharp_methods in zip(available_pairs, all_swift_methods, all_csharp_methods):
         analysis = analyze_file_pair(swift_rel, csharp_rel, swift_methods, csharp_methods)
         
         # Update totals
@@ -240,64 +290,64 @@ def generate_detailed_mapping_report():
         coverage = analysis['coverage_stats']['coverage_percentage']
         status_emoji = "✅" if coverage >= 100 else "⚠️" if coverage >= 50 else "❌"
         
-        report.append(f"## {status_emoji} {Path(swift_rel).stem}")
-        report.append(f"**Files**: `{Path(swift_rel).name}` → `{Path(csharp_rel).name}`")
-        report.append("")
-        report.append(f"### 📊 Coverage Statistics")
-        report.append(f"- **Swift Methods**: {analysis['swift_methods']}")
-        report.append(f"- **C# Methods**: {analysis['csharp_methods']}")
-        report.append(f"- **Coverage**: {coverage}% ({len(analysis['matched_methods'])}/{analysis['swift_methods']})")
-        report.append(f"- **Enhancement Factor**: {analysis['coverage_stats']['enhancement_factor']}x")
-        report.append(f"- **Exact Matches**: {analysis['coverage_stats']['exact_matches']}")
-        report.append(f"- **Partial Matches**: {analysis['coverage_stats']['partial_matches']}")
-        report.append(f"- **Missing Methods**: {analysis['coverage_stats']['missing_methods']}")
-        report.append(f"- **Enhancement Methods**: {analysis['coverage_stats']['enhancement_methods']}")
-        report.append("")
+        write(f"## {status_emoji} {Path(swift_rel).stem}\n")
+        write(f"**Files**: `{Path(swift_rel).name}` → `{Path(csharp_rel).name}`\n")
+        write("\n")
+        write(f"### 📊 Coverage Statistics\n")
+        write(f"- **Swift Methods**: {analysis['swift_methods']}\n")
+        write(f"- **C# Methods**: {analysis['csharp_methods']}\n")
+        write(f"- **Coverage**: {coverage}% ({len(analysis['matched_methods'])}/{analysis['swift_methods']})\n")
+        write(f"- **Enhancement Factor**: {analysis['coverage_stats']['enhancement_factor']}x\n")
+        write(f"- **Exact Matches**: {analysis['coverage_stats']['exact_matches']}\n")
+        write(f"- **Partial Matches**: {analysis['coverage_stats']['partial_matches']}\n")
+        write(f"- **Missing Methods**: {analysis['coverage_stats']['missing_methods']}\n")
+        write(f"- **Enhancement Methods**: {analysis['coverage_stats']['enhancement_methods']}\n")
+        write("\n")
         
         if analysis['matched_methods']:
-            report.append("### ✅ Matched Methods")
+            write("### ✅ Matched Methods\n")
             for match in analysis['matched_methods']:
                 match_symbol = "🎯" if match['match_type'] == 'exact' else "🔗"
-                swift_info = f"Swift: {match['swift']['name']} (L{match['swift']['line']}, {match['swift']['body_length']} lines)"
-                csharp_info = f"C#: {match['csharp']['name']} (L{match['csharp']['line']}, {match['csharp']['body_length']} lines)"
-                report.append(f"- {match_symbol} **{match['match_type'].title()} Match**")
-                report.append(f"  - {swift_info}")  
-                report.append(f"  - {csharp_info}")
-            report.append("")
+                swift_info = f"Swift: {match['swift'].name} (L{match['swift'].line}, {match['swift'].body_length} lines)"
+                csharp_info = f"C#: {match['csharp'].name} (L{match['csharp'].line}, {match['csharp'].body_length} lines)"
+                write(f"- {match_symbol} **{match['match_type'].title()} Match**\n")
+                write(f"  - {swift_info}\n")
+                write(f"  - {csharp_info}\n")
+            write("\n")
         
         if analysis['unmatched_swift']:
-            report.append("### ❌ Missing C# Methods")
+            write("### ❌ Missing C# Methods\n")
             for method in analysis['unmatched_swift']:
-                async_indicator = " (async)" if method['tests_async'] else ""
-                error_indicator = " (error test)" if method['error_testing'] else ""
-                report.append(f"- `{method['name']}`{async_indicator}{error_indicator} - {method['body_length']} lines")
-            report.append("")
+                async_indicator = " (async)" if method.tests_async else ""
+                error_indicator = " (error test)" if method.error_testing else ""
+                write(f"- `{method.name}`{async_indicator}{error_indicator} - {method.body_length} lines\n")
+            write("\n")
         
         if analysis['extra_csharp']:
-            report.append("### 🚀 C# Enhancement Methods")
+            write("### 🚀 C# Enhancement Methods\n")
             for method in analysis['extra_csharp']:
-                unity_indicator = " (Unity)" if method['is_unity_test'] else ""
-                perf_indicator = " (Performance)" if method['performance_test'] else ""
-                async_indicator = " (async)" if method['is_async'] else ""
-                report.append(f"- `{method['name']}`{unity_indicator}{perf_indicator}{async_indicator} - {method['body_length']} lines")
-            report.append("")
+                unity_indicator = " (Unity)" if method.is_unity_test else ""
+                perf_indicator = " (Performance)" if method.performance_test else ""
+                async_indicator = " (async)" if method.is_async else ""
+                write(f"- `{method.name}`{unity_indicator}{perf_indicator}{async_indicator} - {method.body_length} lines\n")
+            write("\n")
         
-        report.append("---")
-        report.append("")
+        write("---\n")
+        write("\n")
     
     # Summary statistics
     overall_coverage = round((total_coverage_stats['total_matched_methods'] / total_coverage_stats['total_swift_methods']) * 100 if total_coverage_stats['total_swift_methods'] > 0 else 0, 1)
     overall_enhancement = round((total_coverage_stats['total_matched_methods'] + total_coverage_stats['total_enhancement_methods']) / total_coverage_stats['total_swift_methods'] if total_coverage_stats['total_swift_methods'] > 0 else 0, 2)
     
-    report.append("## 🏁 DETAILED MAPPING SUMMARY")
-    report.append(f"**Analyzed Files**: {len([p for p in key_pairs if os.path.exists(os.path.join(swift_base, p[0])) and os.path.exists(os.path.join(csharp_base, p[1]))])} file pairs")
-    report.append(f"**Total Swift Methods Analyzed**: {total_coverage_stats['total_swift_methods']}")
-    report.append(f"**Total Matched Methods**: {total_coverage_stats['total_matched_methods']}")
-    report.append(f"**Total Enhancement Methods**: {total_coverage_stats['total_enhancement_methods']}")
-    report.append(f"**Overall Coverage**: {overall_coverage}%")
-    report.append(f"**Overall Enhancement Factor**: {overall_enhancement}x")
+    write("## 🏁 DETAILED MAPPING SUMMARY\n")
+    write(f"**Analyzed Files**: {len([p for p in key_pairs if os.path.exists(os.path.join(swift_base, p[0])) and os.path.exists(os.path.join(csharp_base, p[1]))])} file pairs\n")
+    write(f"**Total Swift Methods Analyzed**: {total_coverage_stats['total_swift_methods']}\n")
+    write(f"**Total Matched Methods**: {total_coverage_stats['total_matched_methods']}\n")
+    write(f"**Total Enhancement Methods**: {total_coverage_stats['total_enhancement_methods']}\n")
+    write(f"**Overall Coverage**: {overall_coverage}%\n")
+    write(f"**Overall Enhancement Factor**: {overall_enhancement}x\n")
     
-    return "\n".join(report)
+    return report.getvalue()
 
 if __name__ == "__main__":
     detailed_report = generate_detailed_mapping_report()
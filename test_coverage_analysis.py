@@ -4,12 +4,63 @@ Comprehensive Test Coverage Analysis Tool
 Analyzes Swift vs C# test coverage for NeoUnity project
 """
 
+import io
 import os
 import re
 from pathlib import Path
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import Dict, List, Set, Tuple
 
+# Swift test methods: public func test... or func test...
+_SWIFT_TEST_RE = re.compile(r'(?:public\s+)?func\s+(test\w+)\s*\([^)]*\)', re.MULTILINE)
+# C# test methods: [Test] or [UnityTest] followed by method
+_CSHARP_TEST_RE = re.compile(r'\[(?:Test|UnityTest)[^\]]*\]\s*(?:public\s+)?(?:async\s+)?(?:Task\s+|void\s+|IEnumerator\s+)(\w*Test\w*)', re.MULTILINE)
+
+# Name fragments marking helper files that hold no tests of their own
+_SWIFT_HELPER_RE = re.compile(r'json|mock|testproperties', re.IGNORECASE)
+_CSHARP_HELPER_RE = re.compile(r'mock|helper|testsuiterunner', re.IGNORECASE)
+
+def _walk_ext(root: str, ext: str):
+    """Yield paths of files ending in ext below root, depth-first with each directory's files before its subdirectories"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.name.endswith(ext):
+                        yield entry.path
+        except OSError:
+            # Like rglob, skip a root or subdirectory that cannot be listed (missing, not a directory, unreadable)
+            continue
+        stack.extend(reversed(subdirs))
+
+def extract_test_methods(file_path: str, is_swift: bool) -> List[str]:
+    """Extract test method names from a test file"""
+    try:
+        content = Path(file_path).read_bytes().decode('utf-8', errors='replace')
+
+        pattern = _SWIFT_TEST_RE if is_swift else _CSHARP_TEST_RE
+        methods = pattern.findall(content)
+        return [m for m in methods if m.lower().startswith('test')]
+
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return []
+
+# Below this many files, process startup and pickling cost more than parallel extraction saves
+_PARALLEL_MIN_FILES = 256
+
+def extract_all_test_methods(file_paths: List[str], is_swift: bool) -> List[List[str]]:
+    """Extract test method names from many files in a process pool, preserving order"""
+    with ProcessPoolExecutor(max_workers=min(len(file_paths), os.cpu_count() or 1)) as executor:
+        return list(executor.map(extract_test_methods, file_paths, repeat(is_swift), chunksize=8))
+
 class TestCoverageAnalyzer:
     def __init__(self):
         self.swift_tests = defaultdict(list)  # {filename: [test_methods]}
@@ -27,69 +78,74 @@ class TestCoverageAnalyzer:
             'helpers': 'Helper/Mock Files',
             'core': 'Core Tests'
         }
+        # Categorized views of swift_tests/csharp_tests, reset whenever they are re-analyzed
+        self._swift_categorized = None
+        self._csharp_categorized = None
     
     def extract_test_methods(self, file_path: str, is_swift: bool) -> List[str]:
         """Extract test method names from a test file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            if is_swift:
-                # Swift test methods: public func test... or func test...
-                pattern = r'(?:public\s+)?func\s+(test\w+)\s*\([^)]*\)'
-            else:
-                # C# test methods: [Test] or [UnityTest] followed by method
-                pattern = r'\[(?:Test|UnityTest)[^\]]*\]\s*(?:public\s+)?(?:async\s+)?(?:Task\s+|void\s+|IEnumerator\s+)(\w*Test\w*)'
-            
-            methods = re.findall(pattern, content, re.MULTILINE)
-            return [m for m in methods if m.lower().startswith('test')]
-            
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            return []
+        return extract_test_methods(file_path, is_swift)
+    
+    def _extract_files(self, file_paths: List[str], is_swift: bool) -> List[List[str]]:
+        """Extract test methods for each file, using a process pool only for large trees"""
+        if len(file_paths) < _PARALLEL_MIN_FILES or (os.cpu_count() or 1) < 2:
+            return [self.extract_test_methods(file_path, is_swift) for file_path in file_paths]
+        return extract_all_test_methods(file_paths, is_swift)
     
     def analyze_swift_tests(self, swift_test_dir: str):
         """Analyze all Swift test files"""
-        swift_path = Path(swift_test_dir)
+        self._swift_categorized = None
         
-        for test_file in swift_path.rglob('*.swift'):
+        test_files = []
+        for test_file in _walk_ext(swift_test_dir, '.swift'):
             # Skip helper files
-            if any(helper in test_file.name.lower() for helper in ['json', 'mock', 'testproperties']):
+            if _SWIFT_HELPER_RE.search(os.path.basename(test_file)):
                 continue
-                
-            relative_path = test_file.relative_to(swift_path)
-            test_methods = self.extract_test_methods(str(test_file), is_swift=True)
-            
+            test_files.append(test_file)
+        all_methods = self._extract_files(test_files, is_swift=True)
+        
+        for test_file, test_methods in zip(test_files, all_methods):
+            relative_path = os.path.relpath(test_file, swift_test_dir)
             if test_methods:
-                self.swift_tests[str(relative_path)] = test_methods
+                self.swift_tests[relative_path] = test_methods
     
     def analyze_csharp_tests(self, csharp_test_dir: str):
         """Analyze all C# test files"""
-        csharp_path = Path(csharp_test_dir)
+        self._csharp_categorized = None
         
-        for test_file in csharp_path.rglob('*.cs'):
+        test_files = []
+        for test_file in _walk_ext(csharp_test_dir, '.cs'):
             # Skip helper files
-            if any(helper in test_file.name.lower() for helper in ['mock', 'helper', 'testsuiterunner']):
+            if _CSHARP_HELPER_RE.search(os.path.basename(test_file)):
                 continue
-                
-            relative_path = test_file.relative_to(csharp_path)
-            test_methods = self.extract_test_methods(str(test_file), is_swift=False)
-            
+            test_files.append(test_file)
+        all_methods = self._extract_files(test_files, is_swift=False)
+        
+        for test_file, test_methods in zip(test_files, all_methods):
+            relative_path = os.path.relpath(test_file, csharp_test_dir)
             if test_methods:
-                self.csharp_tests[str(relative_path)] = test_methods
+                self.csharp_tests[relative_path] = test_methods
     
     def categorize_tests(self, test_dict: Dict) -> Dict[str, Dict]:
         """Categorize tests by domain"""
+        if test_dict is self.swift_tests:
+            if self._swift_categorized is None:
+                self._swift_categorized = self._categorize(test_dict)
+            return self._swift_categorized
+        if test_dict is self.csharp_tests:
+            if self._csharp_categorized is None:
+                self._csharp_categorized = self._categorize(test_dict)
+            return self._csharp_categorized
+        return self._categorize(test_dict)
+    
+    def _categorize(self, test_dict: Dict) -> Dict[str, Dict]:
+        """Group test files under the first category key found in their path"""
         categorized = defaultdict(lambda: defaultdict(list))
         
         for file_path, methods in test_dict.items():
             # Determine category from path
-            category = 'other'
-            for cat_key in self.categories:
-                if cat_key in file_path.lower():
-                    category = cat_key
-                    break
-            
+            path_lower = file_path.lower()
+            category = next((cat_key for cat_key in self.categories if cat_key in path_lower), 'other')
             categorized[category][file_path] = methods
         
         return categorized
@@ -115,21 +171,21 @@ class TestCoverageAnalyzer:
                     'test_count': sum(len(methods) for methods in swift_files.values())
                 })
             else:
-                # Check for missing files within category
-                swift_file_names = set(Path(f).stem.replace('Tests', '') for f in swift_files.keys())
+                # Check for missing files within category, indexing Swift files by their base name
+                by_stem = defaultdict(list)
+                for swift_file, methods in swift_files.items():
+                    by_stem[Path(swift_file).stem.replace('Tests', '')].append((swift_file, methods))
                 csharp_file_names = set(Path(f).stem.replace('Tests', '') for f in csharp_categorized[category].keys())
                 
-                missing_files = swift_file_names - csharp_file_names
+                missing_files = by_stem.keys() - csharp_file_names
                 for missing_file in missing_files:
-                    # Find the original swift file
-                    for swift_file, methods in swift_files.items():
-                        if Path(swift_file).stem.replace('Tests', '') == missing_file:
-                            missing_coverage['missing_files'].append({
-                                'category': category,
-                                'file': swift_file,
-                                'missing_methods': len(methods),
-                                'methods': methods
-                            })
+                    for swift_file, methods in by_stem[missing_file]:
+                        missing_coverage['missing_files'].append({
+                            'category': category,
+                            'file': swift_file,
+                            'missing_methods': len(methods),
+                            'methods': methods
+                        })
         
         # Check C# enhancements (extra tests not in Swift)
         for category, csharp_files in csharp_categorized.items():
@@ -153,10 +209,11 @@ class TestCoverageAnalyzer:
         csharp_categorized = self.categorize_tests(self.csharp_tests)
         missing_coverage = self.find_missing_coverage()
         
-        report = []
-        report.append("# 🧪 ULTIMATE TEST COMPLETENESS VERIFICATION REPORT")
-        report.append("## NeoUnity: Swift → C# Test Coverage Analysis")
-        report.append("")
+        report = io.StringIO()
+        write = report.write
+        write("# 🧪 ULTIMATE TEST COMPLETENESS VERIFICATION REPORT\n")
+        write("## NeoUnity: Swift → C# Test Coverage Analysis\n")
+        write("\n")
         
         # Summary statistics
         swift_total_files = len(self.swift_tests)
@@ -164,17 +221,17 @@ class TestCoverageAnalyzer:
         csharp_total_files = len(self.csharp_tests)  
         csharp_total_methods = sum(len(methods) for methods in self.csharp_tests.values())
         
-        report.append("## 📊 EXECUTIVE SUMMARY")
-        report.append(f"- **Swift Test Files**: {swift_total_files}")
-        report.append(f"- **Swift Test Methods**: {swift_total_methods}")
-        report.append(f"- **C# Test Files**: {csharp_total_files}")
-        report.append(f"- **C# Test Methods**: {csharp_total_methods}")
-        report.append(f"- **Coverage Enhancement Factor**: {round(csharp_total_methods/swift_total_methods if swift_total_methods > 0 else 0, 2)}x")
-        report.append("")
+        write("## 📊 EXECUTIVE SUMMARY\n")
+        write(f"- **Swift Test Files**: {swift_total_files}\n")
+        write(f"- **Swift Test Methods**: {swift_total_methods}\n")
+        write(f"- **C# Test Files**: {csharp_total_files}\n")
+        write(f"- **C# Test Methods**: {csharp_total_methods}\n")
+        write(f"- **Coverage Enhancement Factor**: {round(csharp_total_methods/swift_total_methods if swift_total_methods > 0 else 0, 2)}x\n")
+        write("\n")
         
         # Category-by-category analysis
-        report.append("## 🎯 DETAILED COVERAGE ANALYSIS BY CATEGORY")
-        report.append("")
+        write("## 🎯 DETAILED COVERAGE ANALYSIS BY CATEGORY\n")
+        write("\n")
         
         all_categories = set(swift_categorized.keys()) | set(csharp_categorized.keys())
         
@@ -188,94 +245,93 @@ class TestCoverageAnalyzer:
             
             status = "✅ COMPLETE" if csharp_count >= swift_count and csharp_files else "❌ MISSING" if not csharp_files else "⚠️ PARTIAL"
             
-            report.append(f"### {category_name} - {status}")
-            report.append(f"- **Swift Tests**: {len(swift_files)} files, {swift_count} methods")
-            report.append(f"- **C# Tests**: {len(csharp_files)} files, {csharp_count} methods")
+            write(f"### {category_name} - {status}\n")
+            write(f"- **Swift Tests**: {len(swift_files)} files, {swift_count} methods\n")
+            write(f"- **C# Tests**: {len(csharp_files)} files, {csharp_count} methods\n")
             
             if csharp_count > 0 and swift_count > 0:
                 enhancement = round(csharp_count / swift_count, 2)
-                report.append(f"- **Enhancement Factor**: {enhancement}x")
+                write(f"- **Enhancement Factor**: {enhancement}x\n")
             
             # List files
             if swift_files:
-                report.append("- **Swift Files**:")
+                write("- **Swift Files**:\n")
                 for file_path, methods in swift_files.items():
-                    report.append(f"  - `{Path(file_path).name}` ({len(methods)} tests)")
+                    write(f"  - `{Path(file_path).name}` ({len(methods)} tests)\n")
             
             if csharp_files:
-                report.append("- **C# Files**:")
+                write("- **C# Files**:\n")
                 for file_path, methods in csharp_files.items():
-                    report.append(f"  - `{Path(file_path).name}` ({len(methods)} tests)")
+                    write(f"  - `{Path(file_path).name}` ({len(methods)} tests)\n")
             
-            report.append("")
+            write("\n")
         
         # Missing coverage details
-        report.append("## 🚨 MISSING TEST COVERAGE ANALYSIS")
-        report.append("")
+        write("## 🚨 MISSING TEST COVERAGE ANALYSIS\n")
+        write("\n")
         
         if missing_coverage['missing_categories']:
-            report.append("### ❌ COMPLETELY MISSING CATEGORIES")
+            write("### ❌ COMPLETELY MISSING CATEGORIES\n")
             for missing_cat in missing_coverage['missing_categories']:
-                report.append(f"- **{self.categories.get(missing_cat['category'], missing_cat['category'])}**: {missing_cat['test_count']} tests missing")
+                write(f"- **{self.categories.get(missing_cat['category'], missing_cat['category'])}**: {missing_cat['test_count']} tests missing\n")
                 for file_name in missing_cat['files']:
-                    report.append(f"  - `{Path(file_name).name}`")
-            report.append("")
+                    write(f"  - `{Path(file_name).name}`\n")
+            write("\n")
         
         if missing_coverage['missing_files']:
-            report.append("### ⚠️ MISSING TEST FILES")
+            write("### ⚠️ MISSING TEST FILES\n")
             for missing_file in missing_coverage['missing_files']:
-                report.append(f"- **{self.categories.get(missing_file['category'], missing_file['category'])}**: `{Path(missing_file['file']).name}` ({missing_file['missing_methods']} tests)")
-            report.append("")
+                write(f"- **{self.categories.get(missing_file['category'], missing_file['category'])}**: `{Path(missing_file['file']).name}` ({missing_file['missing_methods']} tests)\n")
+            write("\n")
         
         # C# Enhancements
         if missing_coverage['c_sharp_enhancements']:
-            report.append("### 🚀 C# TEST ENHANCEMENTS (BEYOND SWIFT PARITY)")
+            write("### 🚀 C# TEST ENHANCEMENTS (BEYOND SWIFT PARITY)\n")
             for enhancement in missing_coverage['c_sharp_enhancements']:
-                report.append(f"- **{self.categories.get(enhancement['category'], enhancement['category'])}**: {enhancement['enhancement_factor']}x enhancement ({enhancement['csharp_tests']} vs {enhancement['swift_tests']} tests)")
-            report.append("")
+                write(f"- **{self.categories.get(enhancement['category'], enhancement['category'])}**: {enhancement['enhancement_factor']}x enhancement ({enhancement['csharp_tests']} vs {enhancement['swift_tests']} tests)\n")
+            write("\n")
         
         # Recommendations
-        report.append("## 📋 IMPLEMENTATION RECOMMENDATIONS")
-        report.append("")
+        write("## 📋 IMPLEMENTATION RECOMMENDATIONS\n")
+        write("\n")
         
         total_missing = len(missing_coverage['missing_categories']) + len(missing_coverage['missing_files'])
         if total_missing > 0:
-            report.append(f"### 🎯 PRIORITY ACTIONS ({total_missing} gaps identified)")
-            report.append("")
+            write(f"### 🎯 PRIORITY ACTIONS ({total_missing} gaps identified)\n")
+            write("\n")
             
             # High priority missing categories
             if missing_coverage['missing_categories']:
-                report.append("**HIGH PRIORITY - Missing Categories:**")
+                write("**HIGH PRIORITY - Missing Categories:**\n")
                 for missing_cat in missing_coverage['missing_categories']:
-                    report.append(f"1. Implement {self.categories.get(missing_cat['category'], missing_cat['category'])} ({missing_cat['test_count']} tests)")
-                report.append("")
+                    write(f"1. Implement {self.categories.get(missing_cat['category'], missing_cat['category'])} ({missing_cat['test_count']} tests)\n")
+                write("\n")
             
             # Medium priority missing files  
             if missing_coverage['missing_files']:
-                report.append("**MEDIUM PRIORITY - Missing Files:**")
+                write("**MEDIUM PRIORITY - Missing Files:**\n")
                 for missing_file in missing_coverage['missing_files']:
-                    report.append(f"1. Create `{Path(missing_file['file']).name.replace('.swift', '.cs')}` ({missing_file['missing_methods']} tests)")
-                report.append("")
+                    write(f"1. Create `{Path(missing_file['file']).name.replace('.swift', '.cs')}` ({missing_file['missing_methods']} tests)\n")
+                write("\n")
         
         # Final verdict
         coverage_percentage = round((csharp_total_methods / swift_total_methods) * 100 if swift_total_methods > 0 else 0, 1)
-        report.append("## 🏁 FINAL VERDICT")
-        report.append("")
+        write("## 🏁 FINAL VERDICT\n")
+        write("\n")
         
         if coverage_percentage >= 100 and total_missing == 0:
-            report.append("### ✅ TEST COVERAGE: COMPLETE ✅")
-            report.append("C# implementation has **100% test parity** with Swift plus enhancements!")
+            write("### ✅ TEST COVERAGE: COMPLETE ✅\n")
+            write("C# implementation has **100% test parity** with Swift plus enhancements!\n")
         elif coverage_percentage >= 80:
-            report.append("### ⚠️ TEST COVERAGE: SUBSTANTIAL ⚠️")  
-            report.append(f"C# implementation has **{coverage_percentage}% coverage** of Swift tests with {total_missing} gaps")
+            write("### ⚠️ TEST COVERAGE: SUBSTANTIAL ⚠️\n")
+            write(f"C# implementation has **{coverage_percentage}% coverage** of Swift tests with {total_missing} gaps\n")
         else:
-            report.append("### ❌ TEST COVERAGE: INSUFFICIENT ❌")
-            report.append(f"C# implementation has only **{coverage_percentage}% coverage** of Swift tests")
+            write("### ❌ TEST COVERAGE: INSUFFICIENT ❌\n")
+            write(f"C# implementation has only **{coverage_percentage}% coverage** of Swift tests\n")
         
-        report.append(f"**Overall Enhancement Factor**: {round(csharp_total_methods/swift_total_methods if swift_total_methods > 0 else 0, 2)}x")
-        report.append("")
+        write(f"**Overall Enhancement Factor**: {round(csharp_total_methods/swift_total_methods if swift_total_methods > 0 else 0, 2)}x\n")
         
-        return "\n".join(report)
+        return report.getvalue()
 
 def main():
     analyzer = TestCoverageAnalyzer()